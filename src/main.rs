@@ -1,11 +1,13 @@
 use clap::Parser;
 use reqwest::blocking::Client;
+use reqwest::header::ACCEPT_ENCODING;
 use scraper::{Html, Selector};
 use std::fs::File;
-use std::io::Write;
-use std::path::PathBuf;
+use std::io::{Read, Write};
+use std::path::{Path, PathBuf};
 use std::process::Command;
-use regex::Regex;
+use std::sync::OnceLock;
+use regex::{Captures, Regex};
 use libloading::{Library, Symbol};
 use indicatif::{ProgressBar, ProgressStyle};
 
@@ -36,6 +38,9 @@ struct Args {
     package_install_cmd: String,
 }
 
+static VERSION_RE: OnceLock<Regex> = OnceLock::new();
+static INSTALL_DIR_RE: OnceLock<Regex> = OnceLock::new();
+
 #[derive(Debug)]
 struct SystemInfo {
     arch: String,
@@ -44,28 +49,76 @@ struct SystemInfo {
     package_install_cmd: String,
 }
 
+fn find_jlink_libraries(root: &str, file_prefix: &str, file_suffix: &str) -> Vec<PathBuf> {
+    let mut libraries = Vec::new();
+    let Ok(install_dirs) = std::fs::read_dir(root) else {
+        return libraries;
+    };
+
+    for install_dir in install_dirs.flatten() {
+        if !install_dir.file_name().to_string_lossy().starts_with("JLink") {
+            continue;
+        }
+        let Ok(files) = std::fs::read_dir(install_dir.path()) else {
+            continue;
+        };
+        for file in files.flatten() {
+            let name = file.file_name();
+            let name = name.to_string_lossy();
+            if name.starts_with(file_prefix) && name.ends_with(file_suffix) {
+                libraries.push(file.path());
+            }
+        }
+    }
+
+    // read_dir order is unspecified; sort so the first match is stable
+    libraries.sort();
+    libraries
+}
+
 fn get_current_installed_version(system: &str) -> Option<i32> {
-    let dll_paths = match system {
-        "Linux" => vec!["/opt/SEGGER/JLink*/libjlink*"],
-        "Windows" => vec!["C:\\Program Files*\\SEGGER\\JLink*\\JLink*.dll"],
-        "MacOSX" => vec!["/Applications/SEGGER/JLink*/libjlink*"],
+    let search_roots = match system {
+        "Linux" => vec![("/opt/SEGGER", "libjlink", "")],
+        "Windows" => vec![
+            ("C:\\Program Files\\SEGGER", "JLink", ".dll"),
+            ("C:\\Program Files (x86)\\SEGGER", "JLink", ".dll"),
+        ],
+        "MacOSX" => vec![("/Applications/SEGGER", "libjlink", "")],
         _ => return None,
     };
 
-    for path in dll_paths {
-        if let Ok(paths) = glob::glob(path) {
-            for path in paths.flatten() {
-                if let Ok(lib) = unsafe { Library::new(&path) } {
-                    let func: Symbol<unsafe extern "C" fn() -> i32> = 
-                        unsafe { lib.get(b"JLINK_GetDLLVersion") }.ok()?;
-                    return Some(unsafe { func() });
-                }
-            }
+    let libraries: Vec<PathBuf> = search_roots.into_iter()
+        .flat_map(|(root, file_prefix, file_suffix)| find_jlink_libraries(root, file_prefix, file_suffix))
+        .collect();
+
+    // Prefer the version in install directory names (e.g. JLink_V810g) over
+    // loading a library just to ask for it
+    let newest_installed = libraries.iter()
+        .filter_map(|path| path.parent())
+        .filter_map(install_dir_version_number)
+        .max();
+    if newest_installed.is_some() {
+        return newest_installed;
+    }
+
+    for path in &libraries {
+        if let Ok(lib) = unsafe { Library::new(path) } {
+            let func: Symbol<unsafe extern "C" fn() -> i32> = 
+                unsafe { lib.get(b"JLINK_GetDLLVersion") }.ok()?;
+            return Some(unsafe { func() });
         }
     }
     None
 }
 
+fn install_dir_version_number(dir: &Path) -> Option<i32> {
+    let parse = |dir: &Path| dir.file_name()
+        .and_then(|name| install_dir_to_version_number(&name.to_string_lossy()));
+
+    // The unversioned JLink directory is a symlink to the versioned install
+    parse(dir).or_else(|| parse(&std::fs::canonicalize(dir).ok()?))
+}
+
 fn version_number_to_string(version: i32) -> String {
     let version_str = version.to_string();
     let major = &version_str[0..1];
@@ -82,9 +135,16 @@ fn version_number_to_string(version: i32) -> String {
 }
 
 fn version_string_to_number(version: &str) -> Option<i32> {
-    let re = Regex::new(r"[vV](\d+)\.(\d+)([a-z])?").ok()?;
-    let caps = re.captures(version)?;
-    
+    let re = VERSION_RE.get_or_init(|| Regex::new(r"[vV](\d+)\.(\d+)([a-z])?").unwrap());
+    captures_to_version_number(&re.captures(version)?)
+}
+
+fn install_dir_to_version_number(dir_name: &str) -> Option<i32> {
+    let re = INSTALL_DIR_RE.get_or_init(|| Regex::new(r"^JLink[_-]?V(\d)\.?(\d{2})([a-z])?$").unwrap());
+    captures_to_version_number(&re.captures(dir_name)?)
+}
+
+fn captures_to_version_number(caps: &Captures) -> Option<i32> {
     let major: i32 = caps.get(1)?.as_str().parse().ok()?;
     let minor: i32 = caps.get(2)?.as_str().parse().ok()?;
     let patch = caps.get(3)
@@ -94,6 +154,39 @@ fn version_string_to_number(version: &str) -> Option<i32> {
     Some(major * 10000 + minor * 100 + patch)
 }
 
+// Checked in order; the first package manager found on PATH wins
+const LINUX_PACKAGE_MANAGERS: &[(&str, &str, &str)] = &[
+    ("dpkg", "deb", "sudo dpkg -i"),
+    ("dnf", "rpm", "sudo dnf install"),
+    ("yum", "rpm", "sudo yum install"),
+    ("zypper", "rpm", "sudo zypper install"),
+    ("rpm", "rpm", "sudo rpm -i"),
+];
+
+#[cfg(unix)]
+fn is_executable(path: &Path) -> bool {
+    use std::os::unix::fs::PermissionsExt;
+    path.metadata()
+        .map(|meta| meta.is_file() && meta.permissions().mode() & 0o111 != 0)
+        .unwrap_or(false)
+}
+
+#[cfg(not(unix))]
+fn is_executable(path: &Path) -> bool {
+    path.is_file()
+}
+
+fn detect_linux_package_manager() -> Option<(&'static str, &'static str)> {
+    let path = std::env::var_os("PATH")?;
+    let dirs: Vec<PathBuf> = std::env::split_paths(&path)
+        .filter(|dir| !dir.as_os_str().is_empty())
+        .collect();
+
+    LINUX_PACKAGE_MANAGERS.iter()
+        .find(|(manager, _, _)| dirs.iter().any(|dir| is_executable(&dir.join(manager))))
+        .map(|&(_, package_type, install_cmd)| (package_type, install_cmd))
+}
+
 fn get_system_info(args: &Args) -> Result<SystemInfo, Box<dyn std::error::Error>> {
     let system = if args.system == "auto" {
         std::env::consts::OS
@@ -108,10 +201,10 @@ fn get_system_info(args: &Args) -> Result<SystemInfo, Box<dyn std::error::Error>
             } else {
                 args.arch.clone()
             };
-            
-            // Note: This is simplified. In a real implementation, you'd want to properly
-            // detect the Linux distribution and package manager
-            (arch, "Linux", "deb", "sudo dpkg -i")
+
+            let (package_type, package_install_cmd) = detect_linux_package_manager()
+                .unwrap_or(("deb", "sudo dpkg -i"));
+            (arch, "Linux", package_type, package_install_cmd)
         },
         "macos" => {
             ("universal".to_owned(), "MacOSX", "pkg", "sudo installer -target / -pkg")
@@ -149,6 +242,27 @@ fn get_system_info(args: &Args) -> Result<SystemInfo, Box<dyn std::error::Error>
     })
 }
 
+fn get_latest_version(client: &Client, jlink_url: &str) -> Result<String, Box<dyn std::error::Error>> {
+    let response = client.get(jlink_url).send()?.error_for_status()?;
+    let document = Html::parse_document(&response.text()?);
+    let selector = Selector::parse("select.version option").unwrap();
+    let Some(latest_option) = document.select(&selector).next() else {
+        let version_select = Selector::parse("select.version").unwrap();
+        return Err(if document.select(&version_select).next().is_none() {
+            "Could not find version selector"
+        } else {
+            "Could not find latest version"
+        }.into());
+    };
+
+    let latest_version = latest_option
+        .text()
+        .next()
+        .ok_or("Version text not found")?;
+
+    Ok(latest_version.to_string())
+}
+
 fn main() -> Result<(), Box<dyn std::error::Error>> {
     let args = Args::parse();
     let system_info = get_system_info(&args)?;
@@ -161,19 +275,7 @@ fn main() -> Result<(), Box<dyn std::error::Error>> {
     let client = Client::new();
     let jlink_url = "https://www.segger.com/downloads/jlink/";
     
-    let response = client.get(jlink_url).send()?;
-    let document = Html::parse_document(&response.text()?);
-    let selector = Selector::parse("select.version").unwrap();
-    let version_select = document.select(&selector).next()
-        .ok_or("Could not find version selector")?;
-    
-    let latest_version = version_select.select(&Selector::parse("option").unwrap())
-        .next()
-        .ok_or("Could not find latest version")?
-        .text()
-        .next()
-        .ok_or("Version text not found")?;
-
+    let latest_version = get_latest_version(&client, jlink_url)?;
     let latest_version_number = version_string_to_number(&latest_version)
         .ok_or("Could not parse latest version number")?;
     
@@ -201,7 +303,10 @@ fn main() -> Result<(), Box<dyn std::error::Error>> {
     
     let file_url = format!("{}{}", jlink_url, filename);
     
-    let response = client.post(&file_url)
+    // Only the index page should be compressed; keep the package byte-identical
+    // and its Content-Length intact for the progress bar
+    let mut response = client.post(&file_url)
+        .header(ACCEPT_ENCODING, "identity")
         .form(&[("accept_license_agreement", "accepted")])
         .send()?;
 
@@ -218,10 +323,15 @@ fn main() -> Result<(), Box<dyn std::error::Error>> {
 
     let mut file = File::create(&filename)?;
     let mut downloaded = 0u64;
+    let mut buffer = vec![0u8; 128 * 1024];
 
-    for chunk in response.bytes()?.chunks(1024) {
-        file.write_all(chunk)?;
-        downloaded = std::cmp::min(downloaded + chunk.len() as u64, total_size);
+    loop {
+        let n = response.read(&mut buffer)?;
+        if n == 0 {
+            break;
+        }
+        file.write_all(&buffer[..n])?;
+        downloaded = std::cmp::min(downloaded + n as u64, total_size);
         pb.set_position(downloaded);
     }
     
@@ -235,7 +345,7 @@ fn main() -> Result<(), Box<dyn std::error::Error>> {
             let install_cmd: Vec<&str> = system_info.package_install_cmd.split_whitespace().collect();
             Command::new(install_cmd[0])
                 .args(&install_cmd[1..])
-                .arg(PathBuf::from(&filename).canonicalize()?)
+                .arg(std::env::current_dir()?.join(&filename))
                 .status()?
         };
 